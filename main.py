@@ -1,15 +1,843 @@
-from fastapi import FastAPI
+import asyncio
+import base64
+import os
+import re
+from datetime import datetime
+
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import httpx
+import orjson
+from cachetools import TTLCache
+
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
+
+# Playwright llama a inspect.stack() dentro de Connection.wrap_api_call en
+# cada invocación de su API solo para enriquecer los tracebacks; en cargas de
+# scraping eso llega a ~25% del CPU. No basta con delegar en el original
+# inyectando __pw_stack__ en el task: el default de su getattr se evalúa
+# siempre (getattr(task, "__pw_stack__", inspect.stack())), así que hay que
+# reemplazar los dos wrap_api_call* enteros por versiones que dejen en
+# _api_zone una zona ya parseada y vacía. El costo es que apiName llega
+# vacío al tracing del driver, como en las llamadas internas. Se anula con
+# PW_INSPECT_STACK=1.
+if os.environ.get("PW_INSPECT_STACK", "0") != "1":
+    from playwright._impl._connection import Connection as _PwConnection
+
+    if not hasattr(_PwConnection, "wrap_api_call") or not hasattr(
+        _PwConnection, "wrap_api_call_sync"
+    ):
+        # Mejor fallar en el import que perder el ~25% de CPU en silencio
+        raise RuntimeError(
+            "playwright ya no expone Connection.wrap_api_call(_sync); "
+            "revisar el parche de stacks o arrancar con PW_INSPECT_STACK=1"
+        )
+
+    # ParsedStackTrace pre-parseado: _send_message_to_server lee 'frames'
+    # (para el location del metadata) y 'apiName'. Hace falta al menos un
+    # frame: el driver valida location como objeto y rechaza null
+    _PW_STUB_API_ZONE = {
+        "frames": [{"file": "main.py", "line": 0, "column": 0, "function": ""}],
+        "apiName": "",
+    }
+
+    async def _wrap_api_call_without_stack(self, cb, is_internal=False):
+        if self._api_zone.get():
+            return await cb()
+        self._api_zone.set(_PW_STUB_API_ZONE)
+        try:
+            return await cb()
+        finally:
+            self._api_zone.set(None)
+
+    def _wrap_api_call_sync_without_stack(self, cb, is_internal=False):
+        if self._api_zone.get():
+            return cb()
+        self._api_zone.set(_PW_STUB_API_ZONE)
+        try:
+            return cb()
+        finally:
+            self._api_zone.set(None)
+
+    _PwConnection.wrap_api_call = _wrap_api_call_without_stack
+    _PwConnection.wrap_api_call_sync = _wrap_api_call_sync_without_stack
+import html2text
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Limita el árbol bs4 de extracción a los tags que realmente inspeccionamos,
+# dejando fuera el <head> con sus scripts/estilos inline; 'body' va en la
+# lista para que get_text() siga funcionando como fallback
+_EXTRACTION_STRAINER = SoupStrainer([
+    'body', 'main', 'article', 'div', 'p', 'span', 'a', 'img',
+    'table', 'tr', 'td', 'th', 'ul', 'ol', 'li',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+])
 
-app = FastAPI()
+try:
+    # Parser C (Lexbor) mucho más rápido que bs4 para extraer texto plano
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    # google-re2: ejecución lineal sin backtracking; opcional porque sus
+    # wheels no están disponibles en todas las plataformas
+    import re2 as _regex_engine
+except ImportError:
+    _regex_engine = re
+
+try:
+    # b64encode acelerado con SIMD (libbase64); misma API que base64
+    import pybase64 as _b64_engine
+except ImportError:
+    _b64_engine = base64
+
+# orjson serializa las respuestas grandes (markdown, screenshots) varias
+# veces más rápido que el json de la librería estándar
+class ApiJSONResponse(ORJSONResponse):
+    """ORJSONResponse con fallback a str para tipos que orjson no conoce
+    (HttpUrl, Decimal, etc.), para no depender del jsonable_encoder"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=str)
+
+
+app = FastAPI(default_response_class=ApiJSONResponse)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+
+class ScrapeRequest(BaseModel):
+    url: HttpUrl
+
+
+class ScrapeBatchRequest(BaseModel):
+    urls: list[HttpUrl]
+    # ge=1: un semáforo de 0 dejaría el batch colgado para siempre; el tope
+    # acompaña al límite global de contextos del navegador
+    max_concurrency: int = Field(5, ge=1, le=20)
+
+
+class ScrapedContent(BaseModel):
+    # Los resultados son de solo lectura (se comparten desde la cache);
+    # congelar el modelo lo hace explícito y deja el trabajo al core en C
+    model_config = ConfigDict(frozen=True)
+
+    url: str
+    title: str
+    markdown_content: str
+    metadata: dict
+    images: list
+    links: list
+    amounts: list
+    structured_data: dict
+
+
+def _compile_union(pattern: str, flags: int = 0):
+    """Compila con re2 si puede; re2 no soporta lookarounds, re siempre sí"""
+    try:
+        return _regex_engine.compile(pattern, flags)
+    except Exception:
+        return re.compile(pattern, flags)
+
+
+# Los patrones de montos fusionados en una sola alternación: el texto se
+# recorre una vez en lugar de una pasada por patrón. Todos exigen símbolo o
+# palabra de moneda; un patrón que aceptaba cualquier número suelto producía
+# miles de candidatos en páginas numéricas
+_AMOUNT_UNION = _compile_union(
+    '|'.join((
+        r'\$[\d,]+\.?\d*',
+        r'€[\d,]+\.?\d*',
+        r'£[\d,]+\.?\d*',
+        r'\b\d+\.?\d*\s*(?:USD|EUR|GBP|MXN|dólares|euros|pesos)\b',
+    )),
+    re.IGNORECASE,
+)
+
+# Emails y teléfonos en la misma pasada, despachados por grupo con nombre.
+# El patrón de teléfono ancla con lookarounds y exige el largo completo, lo
+# que elimina el post-filtrado en Python de los candidatos
+_CONTACT_UNION = _compile_union(
+    r'(?P<email>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)'
+    r'|(?P<phone>(?<!\d)(?:\+?[1-9]\d{0,2}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}(?!\d))'
+)
+
+
+# Fechas en una sola alternación, como los montos: una pasada por el texto
+_DATE_UNION = _compile_union(
+    '|'.join((
+        r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',
+        r'\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b',
+        r'\b(?:enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|'
+        r'octubre|noviembre|diciembre|january|february|march|april|may|june|'
+        r'july|august|september|october|november|december)\s+\d{1,2},?\s+\d{4}\b',
+    )),
+    re.IGNORECASE,
+)
+
+_NAME_PATTERNS = [
+    re.compile(pattern)
+    for pattern in (
+        r'\b[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+\s+[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+\b',
+        r'\b(?:Sr\.|Sra\.|Dr\.|Dra\.)\s+[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+\b',
+        r'\b(?:Mr\.|Mrs\.|Ms\.|Dr\.)\s+[A-Z][a-z]+\b',
+        r'\b[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+\s+[A-ZÁÉÍÓÚÑ]\.\s+[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+\b',
+    )
+]
+
+
+def _scan_contacts(text: str):
+    """Escanea el texto una sola vez y separa emails y teléfonos"""
+    emails = []
+    phones = []
+    for match in _CONTACT_UNION.finditer(text):
+        if match.group('email'):
+            emails.append(match.group())
+        else:
+            phones.append(match.group())
+    return emails, phones
+
+
+class ContentProcessor:
+    """Procesador de contenido HTML para organizar y extraer datos"""
+
+    # Sin estado por instancia: evita el dict por objeto en cada request
+    __slots__ = ()
+
+    def extract_amounts(self, text: str) -> list:
+        """Extrae montos y cantidades monetarias del texto"""
+        # dict.fromkeys deduplica en O(n) conservando el orden de aparición
+        return list(dict.fromkeys(
+            match.group() for match in _AMOUNT_UNION.finditer(text)
+        ))
+
+    def extract_structured_data(self, soup: BeautifulSoup, text: str = None,
+                                contacts: tuple = None) -> dict:
+        """Extrae datos estructurados del HTML: tablas, listas, encabezados y contactos.
+
+        Acepta el texto plano ya extraído para no volver a recorrer el árbol,
+        y la tupla (emails, phones) si el llamador ya escaneó los contactos.
+        """
+        structured = {
+            "tables": [],
+            "lists": [],
+            "headings": {},
+            "contact_info": {},
+            "dates": [],
+            "names": [],
+        }
+
+        # Tablas, listas y encabezados en una sola pasada por el árbol,
+        # despachando por tag, en lugar de ocho find_all completos
+        for element in soup.find_all(
+            ['table', 'ul', 'ol', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+        ):
+            name = element.name
+            if name == 'table':
+                table_data = []
+                for tr in element.find_all('tr'):
+                    row = [cell.get_text(strip=True) for cell in tr.find_all(['td', 'th'])]
+                    if any(row):
+                        table_data.append(row)
+                if table_data:
+                    structured["tables"].append(table_data)
+            elif name in ('ul', 'ol'):
+                items = [li.get_text(strip=True) for li in element.find_all('li')]
+                items = [item for item in items if item]
+                if items:
+                    structured["lists"].append(items)
+            else:
+                heading = element.get_text(strip=True)
+                if heading:
+                    structured["headings"].setdefault(name, []).append(heading)
+
+        if text is None:
+            text = soup.get_text()
+
+        # Información de contacto en una sola pasada
+        emails, phones = contacts if contacts is not None else _scan_contacts(text)
+        if emails:
+            structured["contact_info"]["emails"] = list(dict.fromkeys(emails))
+
+        if phones:
+            structured["contact_info"]["phones"] = list(dict.fromkeys(phones))[:10]
+
+        # Fechas
+        dates = [match.group() for match in _DATE_UNION.finditer(text)]
+        if dates:
+            structured["dates"] = list(dict.fromkeys(dates))[:20]
+
+        # Nombres propios (heurística simple)
+        names = []
+        for pattern in _NAME_PATTERNS:
+            names.extend(pattern.findall(text))
+        if names:
+            structured["names"] = list(dict.fromkeys(names))[:15]
+
+        return structured
+
+    def clean_and_organize_content(self, soup: BeautifulSoup) -> str:
+        """Limpia el árbol ya parseado y conserva solo el contenido principal.
+
+        Muta el soup recibido (decompose), así que debe llamarse con un árbol
+        que no se vaya a reutilizar después.
+        """
+        # Eliminar elementos que no aportan contenido
+        for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
+            element.decompose()
+
+        # Buscar el contenedor principal con un solo selector CSS en vez de
+        # tres find encadenados con regex sobre las clases de cada div
+        main_content = soup.select_one(
+            "main, article, div[class*='content'], div[class*='main'], "
+            "div[class*='article']"
+        )
+        return str(main_content) if main_content else str(soup)
+
+
+# Navegador compartido entre requests: lanzar Chromium cuesta 1-2s, un
+# contexto nuevo sobre el mismo navegador es órdenes de magnitud más barato
+_playwright = None
+_browser = None
+_browser_lock = asyncio.Lock()
+
+# Tope global de contextos vivos sobre el navegador compartido: acota la
+# memoria de Chromium cuando /scrape, /scrape/batch y /screenshots compiten
+_MAX_BROWSER_CONTEXTS = 8
+_context_semaphore = asyncio.Semaphore(_MAX_BROWSER_CONTEXTS)
+
+
+async def get_browser():
+    """Devuelve el navegador compartido, lanzándolo la primera vez"""
+    global _playwright, _browser
+    async with _browser_lock:
+        if _browser is None or not _browser.is_connected():
+            # Tras un crash del navegador hay que parar el driver anterior
+            # antes de relanzar, o su subproceso de node queda filtrado
+            if _playwright is not None:
+                try:
+                    await _playwright.stop()
+                except Exception:
+                    pass
+                _playwright = None
+            _playwright = await async_playwright().start()
+            _browser = await _playwright.chromium.launch(headless=True)
+            # Referencias en app.state para introspección (health checks,
+            # debug); se refrescan aquí para que no queden obsoletas tras
+            # un relanzamiento
+            app.state.playwright = _playwright
+            app.state.browser = _browser
+    return _browser
+
+
+async def close_browser():
+    """Cierra el navegador compartido y detiene Playwright"""
+    global _playwright, _browser
+    if _browser is not None:
+        await _browser.close()
+        _browser = None
+    if _playwright is not None:
+        await _playwright.stop()
+        _playwright = None
+
+
+@app.on_event("startup")
+async def startup_browser():
+    # get_browser ya publica las referencias en app.state
+    await get_browser()
+
+
+@app.on_event("shutdown")
+async def shutdown_browser():
+    global _static_client
+    if _static_client is not None:
+        await _static_client.aclose()
+        _static_client = None
+    await close_browser()
+
+
+# Cache de resultados por URL normalizada: un hit evita un scrape de 5-10s
+_scrape_cache = TTLCache(maxsize=1024, ttl=3600)
+
+# Parámetros de query volátiles (tracking, timestamps) que no cambian el contenido
+_VOLATILE_PARAM_RE = re.compile(r'^(utm_|fbclid|gclid|_ga|ts|timestamp|nonce)')
+
+
+def _normalize_url(url: str) -> str:
+    """Normaliza la URL descartando parámetros volátiles y el fragmento"""
+    parts = urlsplit(url)
+    params = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _VOLATILE_PARAM_RE.match(key)
+    ]
+    return urlunsplit(
+        (parts.scheme, parts.netloc, parts.path, urlencode(params), '')
+    )
+
+
+# Cliente HTTP compartido para el camino rápido sin navegador
+_static_client = None
+
+
+def _get_static_client() -> httpx.AsyncClient:
+    global _static_client
+    if _static_client is None:
+        _static_client = httpx.AsyncClient(
+            http2=True, follow_redirects=True, timeout=15
+        )
+    return _static_client
+
+
+# Marcadores típicos de shells de SPA que necesitan renderizado con JS
+_SPA_MARKERS = (
+    'id="__next"',
+    'id="root"',
+    'id="app"',
+    'data-reactroot',
+    'ng-app',
+    'ng-version',
+)
+
+
+def _looks_static(html: str) -> bool:
+    """Heurística: la respuesta trae contenido real y no es un shell de SPA"""
+    if len(html) <= 2000:
+        return False
+    if '<p>' not in html and '<article' not in html:
+        return False
+    return not any(marker in html for marker in _SPA_MARKERS)
+
+
+async def _fetch_static(url: str):
+    """Camino rápido HTTP: devuelve la respuesta si la página parece estática,
+    o None si hay que escalar a Playwright"""
+    try:
+        response = await _get_static_client().get(url)
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    if 'text/html' not in response.headers.get('content-type', ''):
+        return None
+    if not _looks_static(response.text):
+        return None
+    return response
+
+
+# Límites de imágenes y enlaces devueltos por scrape
+_MAX_IMAGES = 20
+_MAX_LINKS = 50
+
+# Recursos que no afectan al HTML extraído; los atributos src de las
+# imágenes siguen siendo legibles desde el DOM sin descargar los bytes
+_BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet'}
+
+
+async def _block_heavy_resources(route):
+    """Aborta las peticiones de recursos pesados durante el scraping"""
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+_COOKIE_TEXTS = [
+    "Aceptar", "Aceptar todo", "Aceptar todas", "Aceptar cookies",
+    "Accept", "Accept all", "Accept cookies", "Agree", "I agree",
+    "Allow", "Allow all", "OK", "Got it", "Entendido", "De acuerdo",
+    "Consentir", "Continuar", "Cerrar",
+]
+
+_COOKIE_SELECTORS = [
+    '#onetrust-accept-btn-handler',
+    '.cookie-accept', '.cookies-accept', '.cookie-consent-accept',
+    '.accept-cookies', '.accept-all', '.btn-accept',
+    '[id*="cookie"] button', '[class*="cookie"] button',
+    '[id*="consent"] button', '[class*="consent"] button',
+    '[aria-label*="cookie"] button', '[aria-label*="accept"]',
+    '.cc-allow', '.cc-dismiss',
+]
+
+# Busca y pulsa el botón de consentimiento dentro del navegador: un único
+# round-trip en vez de decenas de page.click con timeout de 2s cada uno
+_COOKIE_CLICK_JS = """({texts, selectors}) => {
+    const tryDoc = (doc) => {
+        for (const sel of selectors) {
+            const el = doc.querySelector(sel);
+            if (el) { el.click(); return sel; }
+        }
+        for (const el of doc.querySelectorAll('button, a, [role="button"]')) {
+            const t = (el.textContent || '').trim();
+            if (t && texts.includes(t)) { el.click(); return t; }
+        }
+        return null;
+    };
+    let clicked = tryDoc(document);
+    if (clicked) return clicked;
+    for (const frame of document.querySelectorAll('iframe')) {
+        try {
+            if (frame.contentDocument) {
+                clicked = tryDoc(frame.contentDocument);
+                if (clicked) return clicked;
+            }
+        } catch (e) {}
+    }
+    return null;
+}"""
+
+
+async def handle_cookie_dialogs(page):
+    """Intenta cerrar diálogos de cookies y banners de consentimiento"""
+    try:
+        return await page.evaluate(
+            _COOKIE_CLICK_JS,
+            {'texts': _COOKIE_TEXTS, 'selectors': _COOKIE_SELECTORS},
+        )
+    except Exception:
+        return None
+
+
+def _extract_with_lexbor(html_content: str):
+    """Texto plano y HTML limpio con un único parseo Lexbor.
+
+    Primero descarta script/style y toma el texto del body (que conserva
+    nav/header/footer, como siempre hizo el extractor); después elimina
+    también esos contenedores y localiza el contenido principal, como
+    clean_and_organize_content. Devuelve (texto, html_limpio); el texto es
+    None si el documento no tiene body.
+    """
+    tree = LexborHTMLParser(html_content)
+    for node in tree.css('script, style'):
+        node.decompose()
+    page_text = tree.body.text(separator=' ') if tree.body is not None else None
+    for node in tree.css('nav, footer, header, aside'):
+        node.decompose()
+    main_content = tree.css_first(
+        "main, article, div[class*='content'], div[class*='main'], "
+        "div[class*='article']"
+    )
+    clean_html = main_content.html if main_content is not None else tree.html
+    return page_text, clean_html
+
+
+def _html_to_markdown(html: str) -> str:
+    """Convierte HTML a Markdown con html2text.
+
+    Se crea un conversor por llamada: HTML2Text acumula estado interno entre
+    llamadas a handle(), así que una instancia compartida no es segura.
+    """
+    converter = html2text.HTML2Text()
+    converter.body_width = 0
+    converter.ignore_images = False
+    converter.ignore_links = False
+    return converter.handle(html)
+
+
+def _build_scraped_content(url: str, title: str, html_content: str,
+                           images: list, links: list,
+                           doc: BeautifulSoup = None,
+                           totals: tuple = None) -> ScrapedContent:
+    """Procesa el HTML crudo y arma la respuesta final.
+
+    Si el llamador ya parseó el documento completo puede pasarlo en `doc`
+    para no volver a construir el árbol. `totals` trae los conteos reales de
+    (imágenes, enlaces) cuando las listas llegan ya recortadas del navegador.
+    """
+    processor = ContentProcessor()
+
+    # El strainer no sirve para la limpieza (hay que localizar contenedores
+    # arbitrarios): con selectolax disponible un único árbol Lexbor produce
+    # el texto plano y el HTML limpio sin llegar a construir el soup
+    # completo; si no, árbol bs4 completo, reutilizando el del llamador
+    page_text = None
+    if LexborHTMLParser is not None:
+        page_text, clean_html = _extract_with_lexbor(html_content)
+    else:
+        full_soup = doc if doc is not None else BeautifulSoup(html_content, 'lxml')
+        clean_html = processor.clean_and_organize_content(full_soup)
+    markdown_content = _html_to_markdown(clean_html)
+
+    # Con Lexbor la limpieza no tocó el árbol del llamador, así que sirve
+    # tal cual para la extracción (find_all devuelve lo mismo sobre el árbol
+    # completo); el parse con strainer queda para cuando no hay árbol o la
+    # limpieza bs4 del fallback ya lo mutó
+    if doc is not None and LexborHTMLParser is not None:
+        soup = doc
+    else:
+        soup = BeautifulSoup(html_content, 'lxml', parse_only=_EXTRACTION_STRAINER)
+
+    if page_text is None:
+        # Ojo: el strainer NO filtra los <script>/<style> del body (quedan
+        # materializados en el soup); su texto se excluye solo porque bs4
+        # los tipa como Script/Stylesheet y get_text() omite esos nodos.
+        # Si cambia el parser o el tipado de bs4, revisar este fallback
+        page_text = soup.get_text(' ')
+
+    emails, phones = _scan_contacts(page_text)
+
+    amounts = processor.extract_amounts(page_text)
+    structured_data = processor.extract_structured_data(
+        soup, page_text, contacts=(emails, phones)
+    )
+
+    metadata = {
+        "scraped_at": datetime.utcnow().isoformat(),
+        "images_count": totals[0] if totals is not None else len(images),
+        "links_count": totals[1] if totals is not None else len(links),
+        "emails_found": len(set(emails)),
+        "phones_found": len(set(phones)),
+        "content_length": len(html_content),
+    }
+
+    return ScrapedContent(
+        url=str(url),
+        title=title,
+        markdown_content=markdown_content,
+        metadata=metadata,
+        images=images[:_MAX_IMAGES],
+        links=links[:_MAX_LINKS],
+        amounts=amounts,
+        structured_data=structured_data,
+    )
+
+
+def _parse_static_response(url: str, static_response) -> ScrapedContent:
+    """Parsea la respuesta del camino estático y arma el resultado final.
+
+    Síncrono a propósito: se despacha entero vía asyncio.to_thread. Se
+    parsean los bytes crudos para ahorrar la re-codificación str -> UTF-8
+    que haría lxml con el texto ya decodificado.
+    """
+    html_content = static_response.text
+    doc = BeautifulSoup(static_response.content, 'lxml')
+    title = doc.title.get_text(strip=True) if doc.title else ''
+    # Resolver contra la URL final (tras redirecciones) como hace el DOM
+    # en el camino con navegador; sin esto las URLs relativas se perdían
+    base_url = str(static_response.url)
+    images = [
+        src for src in (
+            urljoin(base_url, raw_src)
+            for raw_src in (
+                img.get('src') or img.get('data-src')
+                for img in doc.find_all('img')
+            )
+            if raw_src
+        )
+        if src.startswith('http')
+    ]
+    links = [
+        {'text': text[:200], 'url': href}
+        for text, href in (
+            (a.get_text(strip=True), urljoin(base_url, a['href']))
+            for a in doc.find_all('a', href=True)
+        )
+        if text and href.startswith('http')
+    ]
+    return _build_scraped_content(url, title, html_content, images, links, doc)
+
+
+async def scrape_url_content(url: str) -> ScrapedContent:
+    """Scrapea una URL con Playwright, o por HTTP directo si la página es estática,
+    y devuelve el contenido organizado"""
+    cache_key = _normalize_url(url)
+    cached = _scrape_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    static_response = await _fetch_static(url)
+    if static_response is not None:
+        # Página estática: sin navegador, el HTML ya trae todo el contenido.
+        # Todo el parseo y la extracción corren en un hilo: en páginas
+        # grandes el parse lxml y los find_all bloquearían el event loop
+        result = await asyncio.to_thread(_parse_static_response, url, static_response)
+        _scrape_cache[cache_key] = result
+        return result
+
+    browser = await get_browser()
+    async with _context_semaphore:
+        title, html_content, images, links, totals = await _scrape_with_browser(
+            browser, url
+        )
+
+    result = await asyncio.to_thread(
+        _build_scraped_content, url, title, html_content, images, links,
+        totals=totals,
+    )
+    _scrape_cache[cache_key] = result
+    return result
+
+
+async def _scrape_with_browser(browser, url: str):
+    """Renderiza la URL en un contexto nuevo y devuelve los datos crudos"""
+    # Contexto mínimo para scraping: sin service workers ni CSP, que solo
+    # retrasan el domcontentloaded sin aportar contenido
+    context = await browser.new_context(
+        service_workers='block',
+        bypass_csp=True,
+        ignore_https_errors=True,
+        viewport={'width': 1280, 'height': 720},
+    )
+    try:
+        await context.route('**/*', _block_heavy_resources)
+        page = await context.new_page()
+
+        await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+
+        # El manejo de cookies es mejor esfuerzo: acota su latencia de cola
+        # en vez de dejar que pierda segundos en páginas sin banner
+        try:
+            await asyncio.wait_for(handle_cookie_dialogs(page), timeout=1.5)
+        except asyncio.TimeoutError:
+            pass
+
+        # Espera dirigida por eventos: retoma en cuanto la red queda inactiva
+        # en lugar de quemar 5s fijos en páginas que ya terminaron de cargar
+        try:
+            await page.wait_for_load_state('networkidle', timeout=5000)
+        except PlaywrightTimeoutError:
+            pass
+
+        # Un solo round-trip CDP para título, HTML, imágenes y enlaces; las
+        # listas se recortan en el navegador para no serializar datos que
+        # Python descartaría
+        dom_data = await page.evaluate("""({maxImages, maxLinks}) => ({
+            title: document.title,
+            html: document.documentElement.outerHTML,
+            imagesTotal: document.images.length,
+            linksTotal: document.querySelectorAll('a[href]').length,
+            images: Array.from(document.images)
+                .map(img => img.src || img.dataset.src)
+                .filter(src => src && src.startsWith('http'))
+                .slice(0, maxImages),
+            links: (() => {
+                const out = [];
+                for (const a of document.querySelectorAll('a[href]')) {
+                    const text = a.textContent.trim();
+                    if (text && a.href) {
+                        out.push({text: text.slice(0, 200), url: a.href});
+                        if (out.length >= maxLinks) break;
+                    }
+                }
+                return out;
+            })(),
+        })""", {'maxImages': _MAX_IMAGES, 'maxLinks': _MAX_LINKS})
+        title = dom_data['title']
+        html_content = dom_data['html']
+        images = dom_data['images']
+        links = dom_data['links']
+        totals = (dom_data['imagesTotal'], dom_data['linksTotal'])
+    finally:
+        await context.close()
+
+    return title, html_content, images, links, totals
+
+
+def _b64(data: bytes) -> str:
+    """Codifica bytes a base64; 'ascii' evita el chequeo UTF-8 del decode"""
+    return _b64_engine.b64encode(data).decode('ascii')
+
+
+async def capture_screenshots_playwright(url: str) -> dict:
+    """Captura screenshots de la página completa y de sus secciones principales"""
+    screenshots_base64 = {}
+
+    browser = await get_browser()
+    async with _context_semaphore:
+        context = await browser.new_context(viewport={'width': 1280, 'height': 720})
+        try:
+            await _capture_page_screenshots(context, url, screenshots_base64)
+        finally:
+            await context.close()
+
+    # Limitar la cantidad de capturas devueltas
+    if len(screenshots_base64) > 5:
+        screenshots_base64 = dict(list(screenshots_base64.items())[:5])
+
+    return {
+        "url": url,
+        "captured_at": datetime.utcnow().isoformat(),
+        "screenshots": screenshots_base64,
+    }
+
+
+async def _capture_page_screenshots(context, url: str, screenshots_base64: dict):
+    """Navega la página y va llenando el dict de capturas en base64"""
+    page = await context.new_page()
+
+    # domcontentloaded + readyState: la mayoría de páginas ya están pintadas
+    # mucho antes de las dos ventanas de networkidle que se usaban aquí
+    await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+    await handle_cookie_dialogs(page)
+    try:
+        await page.wait_for_function(
+            "document.readyState === 'complete'", timeout=5000
+        )
+    except PlaywrightTimeoutError:
+        pass
+
+    async def _section_shot(section_name: str, selector: str):
+        locator = page.locator(selector).first
+        try:
+            if await locator.count() > 0:
+                return section_name, await locator.screenshot(type='png')
+        except Exception:
+            pass
+        return section_name, None
+
+    # Todas las capturas en paralelo: cada una es un round-trip CDP y tocan
+    # subárboles independientes, así que la latencia se solapa. Las de página
+    # van en JPEG, 5-10x menos bytes que PNG, que es lo que domina la
+    # respuesta JSON
+    results = await asyncio.gather(
+        page.screenshot(type='jpeg', quality=85),
+        page.screenshot(full_page=True, type='jpeg', quality=85),
+        _section_shot("header", "header"),
+        _section_shot("main_content", "main"),
+        _section_shot("footer", "footer"),
+        return_exceptions=True,
+    )
+
+    if not isinstance(results[0], BaseException):
+        screenshots_base64["viewport"] = _b64(results[0])
+    if not isinstance(results[1], BaseException):
+        screenshots_base64["full_page"] = _b64(results[1])
+    for item in results[2:]:
+        if isinstance(item, BaseException):
+            continue
+        section_name, section_screenshot = item
+        if section_screenshot is not None:
+            screenshots_base64[section_name] = _b64(section_screenshot)
+
+
+async def capture_full_screenshot(url: str) -> bytes:
+    """Captura solo la página completa y devuelve los bytes PNG"""
+    browser = await get_browser()
+    async with _context_semaphore:
+        context = await browser.new_context(viewport={'width': 1280, 'height': 720})
+        try:
+            page = await context.new_page()
+            await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+            await handle_cookie_dialogs(page)
+            try:
+                await page.wait_for_function(
+                    "document.readyState === 'complete'", timeout=5000
+                )
+            except PlaywrightTimeoutError:
+                pass
+            return await page.screenshot(full_page=True, type='png')
+        finally:
+            await context.close()
+
+
 @app.get("/.well-known/appspecific/com.chrome.devtools.json")
 def chrome_devtools_config():
     """Endpoint para configuración de Chrome DevTools"""
-    return JSONResponse(content={
+    return {
         "name": "ScraperMaster API",
         "version": "1.0.0",
         "description": "API para scraping de datos",
@@ -17,8 +845,61 @@ def chrome_devtools_config():
             "enabled": True,
             "debuggingPort": 9229
         }
-    })
+    }
+
 
 @app.get("/")
 def read_root():
     return {"message": "Hello, FastAPI!"}
+
+
+@app.post("/scrape", response_model=ScrapedContent)
+async def scrape(request: ScrapeRequest):
+    """Scrapea la URL indicada y devuelve su contenido en markdown con datos extraídos"""
+    try:
+        return await scrape_url_content(str(request.url))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al scrapear la URL: {e}")
+
+
+@app.post("/scrape/batch")
+async def scrape_urls_batch(request: ScrapeBatchRequest):
+    """Scrapea varias URLs en paralelo con concurrencia limitada"""
+    semaphore = asyncio.Semaphore(request.max_concurrency)
+
+    async def _scrape_one(url: HttpUrl):
+        async with semaphore:
+            return await scrape_url_content(str(url))
+
+    results = await asyncio.gather(
+        *[_scrape_one(url) for url in request.urls],
+        return_exceptions=True,
+    )
+
+    response = []
+    for url, result in zip(request.urls, results):
+        if isinstance(result, Exception):
+            response.append({"url": str(url), "error": str(result)})
+        else:
+            response.append(result)
+    return {"results": response}
+
+
+@app.post("/screenshots")
+async def screenshots(request: ScrapeRequest):
+    """Captura screenshots de la URL indicada"""
+    try:
+        return await capture_screenshots_playwright(str(request.url))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al capturar screenshots: {e}")
+
+
+@app.post("/screenshots/raw")
+async def screenshot_raw(request: ScrapeRequest):
+    """Devuelve la captura de página completa como PNG crudo, sin base64
+    ni el 33% de inflado que este añade al JSON"""
+    try:
+        png = await capture_full_screenshot(str(request.url))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al capturar screenshot: {e}")
+    return Response(content=png, media_type="image/png")